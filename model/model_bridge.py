@@ -7,16 +7,36 @@ model_bridge.py - Мост между TypeScript и Python-моделью для
 Этот скрипт обрабатывает запросы от NeuroSolidityAuditor и возвращает результаты в формате JSON.
 """
 
-import argparse
+import bisect
+import contextlib
+import functools
+import hashlib
+import importlib
 import json
+import mmap
 import os
 import sys
 import re
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Callable, Dict, List, Any, Iterator, Optional, Tuple
 
 # Путь к директории с моделью
 MODEL_DIR = os.path.dirname(os.path.abspath(__file__))
 
+# Действия, поддерживаемые мостом
+ACTIONS = ('audit', 'test', 'patch')
+
+# Директория для кэша результатов анализа
+CACHE_DIR = os.path.join(MODEL_DIR, '.cache')
+
+# Максимальное число результатов в кэше; при превышении удаляются самые старые
+CACHE_MAX_ENTRIES = 10000
+
+# Минимальный размер контракта, с которого он сканируется через mmap без декодирования
+MMAP_MIN_SIZE = 1 << 20
+
+# Минимальный размер пакета, с которого аудит распределяется по процессам
+BATCH_PARALLEL_THRESHOLD = 10
+
 # Паттерны для поиска уязвимостей
 VULNERABILITY_PATTERNS = {
     "reentrancy": r"(\.\s*call\s*{.*value\s*:.*})(?!.*_mutex)",
@@ -26,49 +46,233 @@ VULNERABILITY_PATTERNS = {
     "unsecured_selfdestruct": r"selfdestruct|suicide"
 }
 
-# Соответствие между ключами уязвимостей и их названиями
-VULNERABILITY_NAMES = {
-    "reentrancy": "Reentrancy Vulnerability",
-    "integer_overflow": "Integer Overflow",
-    "unchecked_return": "Unchecked Return Value",
-    "tx_origin": "tx.origin Authentication",
-    "unsecured_selfdestruct": "Unsecured Self-Destruct"
-}
+# Метаданные уязвимостей в порядке VULNERABILITY_PATTERNS:
+# (название, серьезность, вес в общем скоре уязвимости)
+VULN_META = (
+    ("Reentrancy Vulnerability", "critical", 0.3),
+    ("Integer Overflow", "high", 0.2),
+    ("Unchecked Return Value", "medium", 0.1),
+    ("tx.origin Authentication", "high", 0.2),
+    ("Unsecured Self-Destruct", "critical", 0.3)
+)
+
+# Скомпилированные паттерны уязвимостей (компилируются один раз при импорте),
+# индекс паттерна совпадает с индексом в VULN_META
+COMPILED_VULN_PATTERNS = tuple(
+    re.compile(pattern, re.IGNORECASE)
+    for pattern in VULNERABILITY_PATTERNS.values()
+)
+
+# Объединенный паттерн для поиска строк-кандидатов за один проход по всему коду
+MASTER_VULN_RE = re.compile(
+    "|".join(f"(?:{pattern})" for pattern in VULNERABILITY_PATTERNS.values()),
+    re.IGNORECASE
+)
+
+# Паттерны без завершающих негативных lookahead, которые не поддерживаются
+# DFA-движками. Они находят надмножество совпадений исходных паттернов,
+# поэтому годятся только для поиска строк-кандидатов
+PREFILTER_PATTERNS = [re.sub(r"\(\?!.*\)$", "", pattern) for pattern in VULNERABILITY_PATTERNS.values()]
+
+# Литералы, хотя бы один из которых (без учета регистра) входит в любое
+# совпадение паттернов уязвимостей
+VULN_REQUIRED_LITERALS = (b"+", b"call", b"tx.origin", b"selfdestruct", b"suicide")
+VULN_REQUIRED_TEXT_LITERALS = tuple(literal.decode() for literal in VULN_REQUIRED_LITERALS)
+
+# Размер окна, которым отображённый в память контракт проверяется на литералы
+LITERAL_WINDOW_SIZE = 1 << 16
+
+# Символы, которые re с флагом IGNORECASE сопоставляет с латинскими буквами
+_CASE_PROXIES = {"\u0130": "i", "\u0131": "i", "\u017f": "s", "\u212a": "k"}
+_CASE_PROXY_TABLE = str.maketrans(_CASE_PROXIES)
+_CASE_PROXY_RE = re.compile("[" + "".join(_CASE_PROXIES) + "]")
+
+# ASCII-символы, которые \s в re считает пробельными, а DFA-движки - нет
+_SPACE_PROXIES = bytes.maketrans(b"\x0b\x1c\x1d\x1e\x1f", b"     ")
+
+# Не-ASCII символы, которые в ASCII-представлении заменяются не на "?":
+# пробельные (\s) и совпадающие под IGNORECASE с латинскими буквами
+_PROXY_CHARS_RE = re.compile("[" + "".join(_CASE_PROXIES) + r"]|(?![\x00-\x7f])\s")
+
+def _write_atomic(path: str, data: bytes) -> None:
+    """Атомарная запись файла кэша: параллельные вызовы не увидят частично записанный файл"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_file = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_file, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_file, path)
+
+@functools.lru_cache(maxsize=None)
+def _optional_module(name: str) -> Any:
+    """Ленивый импорт необязательной зависимости (None, если она не установлена)
+    
+    DFA-движки (hyperscan, re2) и orjson импортируются только там, где
+    они нужны: при попадании в кэш результатов сканирование не выполняется.
+    """
+    try:
+        return importlib.import_module(name)
+    except ImportError:
+        return None
+
+def _build_hyperscan_db(hyperscan: Any) -> Any:
+    """Компиляция базы Hyperscan из паттернов-префильтров"""
+    db = hyperscan.Database()
+    db.compile(
+        expressions=[pattern.encode() for pattern in PREFILTER_PATTERNS],
+        ids=list(range(len(PREFILTER_PATTERNS))),
+        elements=len(PREFILTER_PATTERNS),
+        flags=[hyperscan.HS_FLAG_CASELESS] * len(PREFILTER_PATTERNS)
+    )
+    return db
 
-# Соответствие между ключами уязвимостей и их серьезностью
-VULNERABILITY_SEVERITIES = {
-    "reentrancy": "critical",
-    "integer_overflow": "high",
-    "unchecked_return": "medium",
-    "tx_origin": "high",
-    "unsecured_selfdestruct": "critical"
+def _load_hyperscan_db(hyperscan: Any) -> Any:
+    """База Hyperscan из кэша на диске; компиляция только при его отсутствии
+    
+    Компиляция базы - основная часть времени холодного запуска, поэтому
+    сериализованная база хранится в CACHE_DIR. Ключ включает паттерны
+    и версию hyperscan; несовместимая или повреждённая база пересобирается.
+    """
+    digest = hashlib.sha256("\0".join(PREFILTER_PATTERNS).encode())
+    digest.update(hyperscan.__version__.encode())
+    cache_file = os.path.join(CACHE_DIR, f"{digest.hexdigest()}.hsdb")
+    
+    try:
+        with open(cache_file, 'rb') as f:
+            db = hyperscan.loadb(f.read(), hyperscan.HS_MODE_BLOCK)
+        db.scratch = hyperscan.Scratch(db)
+        return db
+    except Exception:
+        pass
+    
+    db = _build_hyperscan_db(hyperscan)
+    try:
+        _write_atomic(cache_file, hyperscan.dumpb(db))
+    except Exception:
+        pass
+    return db
+
+@functools.lru_cache(maxsize=None)
+def _prefilter_backend() -> Tuple[Any, Any]:
+    """DFA-движок для поиска строк-кандидатов: (база Hyperscan, паттерн re2), создаётся при первом сканировании"""
+    hyperscan = _optional_module('hyperscan')
+    if hyperscan is not None:
+        return _load_hyperscan_db(hyperscan), None
+    
+    re2 = _optional_module('re2')
+    if re2 is not None:
+        return None, re2.compile(("(?i)" + "|".join(f"(?:{pattern})" for pattern in PREFILTER_PATTERNS)).encode())
+    
+    return None, None
+
+# Паттерны для анализа AST-топологии
+FUNCTION_RE = re.compile(r"function\s+\w+\s*\(")
+STATE_VAR_RE = re.compile(r"(uint|int|bool|address|string|bytes|mapping)\s+\w+")
+MODIFIER_RE = re.compile(r"modifier\s+\w+\s*\(")
+EVENT_RE = re.compile(r"event\s+\w+\s*\(")
+
+# Паттерны для генерации тест-кейсов
+FUNCTION_SIGNATURE_RE = re.compile(r"function\s+(\w+)\s*\(([^)]*)\)\s*(public|external|internal|private)?\s*(view|pure|payable)?\s*(?:returns\s*\(([^)]*)\))?\s*{")
+
+# Значения параметров тест-кейсов: сначала точное совпадение типа,
+# затем префикс, выбираемый по первому символу (uint*, int*, bytes*)
+PARAM_EXACT_DEFAULTS = {
+    "bool": True,
+    "address": "0x1234567890123456789012345678901234567890",
+    "string": "test",
+}
+PARAM_PREFIX_DEFAULTS = {
+    "u": ("uint", 100),
+    "i": ("int", -10),
+    "b": ("bytes", "0x1234"),
 }
 
-def read_contract(contract_path: str) -> str:
-    """Чтение контракта из файла"""
+# Паттерн для поиска имени функции при генерации патча
+FUNCTION_NAME_RE = re.compile(r"function\s+(\w+)")
+
+# Байты, при которых байтовые паттерны и bytes.strip ведут себя иначе, чем
+# их строковые версии на декодированном тексте (или нужен перевод строк)
+MMAP_FALLBACK_RE = re.compile(rb"[\r\x1c-\x1f\x80-\xff]")
+
+@functools.lru_cache(maxsize=None)
+def _bytes_patterns() -> Tuple[Tuple[Any, ...], Any, Tuple[Any, ...]]:
+    """Байтовые версии паттернов уязвимостей и топологии для отображённых в память контрактов"""
+    def to_bytes(pattern: Any) -> Any:
+        return re.compile(pattern.pattern.encode(), pattern.flags & ~re.UNICODE)
+    
+    return (
+        tuple(to_bytes(pattern) for pattern in COMPILED_VULN_PATTERNS),
+        to_bytes(MASTER_VULN_RE),
+        tuple(to_bytes(pattern) for pattern in (FUNCTION_RE, STATE_VAR_RE, MODIFIER_RE, EVENT_RE))
+    )
+
+def _decode_contract(contract_data: bytes) -> str:
+    """Декодирование контракта с тем же преобразованием переводов строк, что и в текстовом режиме"""
+    contract_code = contract_data.decode('utf-8')
+    if '\r' in contract_code:
+        contract_code = contract_code.replace('\r\n', '\n').replace('\r', '\n')
+    return contract_code
+
+def _load_contract(contract_path: str) -> Tuple[bytes, str]:
+    """Чтение контракта одним вызовом read: исходные байты и декодированный текст"""
     try:
-        with open(contract_path, 'r', encoding='utf-8') as f:
-            return f.read()
+        with open(contract_path, 'rb', buffering=0) as f:
+            contract_data = f.read()
+        return contract_data, _decode_contract(contract_data)
     except Exception as e:
         print(f"Ошибка при чтении контракта: {e}", file=sys.stderr)
-        return ""
+        return b"", ""
+
+def read_contract(contract_path: str) -> str:
+    """Чтение контракта из файла"""
+    return _load_contract(contract_path)[1]
+
+@contextlib.contextmanager
+def _mapped_contract(contract_path: str) -> Iterator[Optional[mmap.mmap]]:
+    """Отображение большого контракта в память (None, если нужен обычный путь чтения)
+    
+    Через mmap сканируются только файлы от MMAP_MIN_SIZE из ASCII без '\\r':
+    на них байтовые паттерны совпадают с исходными, и текст не нужно
+    ни копировать, ни декодировать. Ошибки открытия обрабатывает обычный путь.
+    """
+    contract_map = None
+    try:
+        with open(contract_path, 'rb', buffering=0) as f:
+            if os.fstat(f.fileno()).st_size >= MMAP_MIN_SIZE:
+                contract_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        pass
+    
+    if contract_map is None:
+        yield None
+        return
+    
+    with contract_map:
+        yield contract_map if MMAP_FALLBACK_RE.search(contract_map) is None else None
 
 def analyze_ast_topology(contract_code: str) -> Dict[str, Any]:
     """Анализ AST-топологии контракта"""
     # В реальном приложении здесь будет парсинг контракта в AST и анализ
     # Для примера используем заглушку
     
+    # Отдельные проходы быстрее объединенного: у каждого паттерна есть
+    # литеральный префикс, по которому re ищет кандидатов без перебора позиций
+    
+    if isinstance(contract_code, str):
+        function_re, state_var_re, modifier_re, event_re = FUNCTION_RE, STATE_VAR_RE, MODIFIER_RE, EVENT_RE
+    else:
+        function_re, state_var_re, modifier_re, event_re = _bytes_patterns()[2]
+    
     # Подсчет количества функций
-    function_count = len(re.findall(r"function\s+\w+\s*\(", contract_code))
+    function_count = len(function_re.findall(contract_code))
     
     # Подсчет количества переменных состояния
-    state_vars_count = len(re.findall(r"(uint|int|bool|address|string|bytes|mapping)\s+\w+", contract_code))
+    state_vars_count = len(state_var_re.findall(contract_code))
     
     # Подсчет количества модификаторов
-    modifier_count = len(re.findall(r"modifier\s+\w+\s*\(", contract_code))
+    modifier_count = len(modifier_re.findall(contract_code))
     
     # Подсчет количества событий
-    event_count = len(re.findall(r"event\s+\w+\s*\(", contract_code))
+    event_count = len(event_re.findall(contract_code))
     
     # Оценка сложности контракта
     complexity = "low"
@@ -84,44 +288,184 @@ def analyze_ast_topology(contract_code: str) -> Dict[str, Any]:
         "complexity": complexity
     }
 
-def find_vulnerabilities(contract_code: str) -> List[Dict[str, Any]]:
-    """Поиск уязвимостей в контракте"""
-    vulnerabilities = []
+def _line_starts(contract_code: str) -> List[int]:
+    """Смещения начала каждой строки в коде
     
-    # Разбиение кода на строки
-    lines = contract_code.split('\n')
-    
-    # Поиск уязвимостей по паттернам
-    for i, line in enumerate(lines):
-        for vuln_key, pattern in VULNERABILITY_PATTERNS.items():
-            if re.search(pattern, line, re.IGNORECASE):
-                # Получение контекста (несколько строк до и после)
-                start_idx = max(0, i - 2)
-                end_idx = min(len(lines), i + 3)
-                context = '\n'.join(lines[start_idx:end_idx])
-                
-                # Создание объекта уязвимости
-                vulnerability = {
-                    "name": VULNERABILITY_NAMES.get(vuln_key, "Unknown Vulnerability"),
-                    "severity": VULNERABILITY_SEVERITIES.get(vuln_key, "medium"),
-                    "confidence": 0.85,
-                    "lines": [
-                        {
-                            "line_number": i + 1,
-                            "line": line.strip(),
-                            "context": context
-                        }
-                    ]
+    Последний элемент - фиктивное начало строки за концом кода, так что строка i
+    всегда занимает contract_code[line_starts[i]:line_starts[i + 1] - 1].
+    """
+    newline = '\n' if isinstance(contract_code, str) else b'\n'
+    line_starts = [0]
+    pos = contract_code.find(newline)
+    while pos != -1:
+        line_starts.append(pos + 1)
+        pos = contract_code.find(newline, pos + 1)
+    line_starts.append(len(contract_code) + 1)
+    return line_starts
+
+def _ascii_proxy(contract_code: Any) -> Any:
+    """ASCII-представление кода для DFA-движков со смещениями, совпадающими с исходной строкой
+    
+    Отображённый в память контракт уже состоит из ASCII и передаётся как есть
+    (re2 и новые версии Hyperscan принимают буфер, для старых см. _candidate_lines).
+    """
+    if not isinstance(contract_code, str):
+        return contract_code
+    if contract_code.isascii():
+        return contract_code.encode("ascii").translate(_SPACE_PROXIES)
+    
+    # Каждый не-ASCII символ кодируется одним "?", так что смещения сохраняются;
+    # затем на место "?" ставятся аналоги редких символов, найденных одним проходом
+    proxy = bytearray(contract_code.encode("ascii", "replace"))
+    for match in _PROXY_CHARS_RE.finditer(contract_code):
+        char = match.group()
+        proxy[match.start()] = ord(_CASE_PROXIES.get(char, " "))
+    return bytes(proxy.translate(_SPACE_PROXIES))
+
+def _may_contain_vulnerabilities(contract_code: Any) -> bool:
+    """Быстрая проверка наличия литералов, без которых ни один паттерн уязвимости не совпадёт
+    
+    Поиск без учета регистра идет по коду в нижнем регистре. Символы, которые
+    IGNORECASE сопоставляет с латинскими буквами, а lower() - нет, перед этим
+    заменяются этими буквами. Отображённый в память контракт проверяется
+    окнами, без копирования целиком.
+    """
+    if not isinstance(contract_code, str):
+        overlap = max(map(len, VULN_REQUIRED_LITERALS)) - 1
+        for start in range(0, len(contract_code), LITERAL_WINDOW_SIZE):
+            window = contract_code[start:start + LITERAL_WINDOW_SIZE + overlap].lower()
+            if any(literal in window for literal in VULN_REQUIRED_LITERALS):
+                return True
+        return False
+    
+    if not contract_code.isascii() and _CASE_PROXY_RE.search(contract_code):
+        contract_code = contract_code.translate(_CASE_PROXY_TABLE)
+    haystack = contract_code.lower()
+    return any(literal in haystack for literal in VULN_REQUIRED_TEXT_LITERALS)
+
+def _search_candidate_lines(regex: Any, buffer: Any, line_starts: List[int]) -> Iterator[int]:
+    """Поиск строк-кандидатов последовательными вызовами search с переходом на следующую строку"""
+    pos = 0
+    while True:
+        match = regex.search(buffer, pos)
+        if match is None:
+            return
+        
+        i = bisect.bisect_right(line_starts, match.start()) - 1
+        yield i
+        
+        if i + 2 >= len(line_starts):
+            return
+        pos = line_starts[i + 1]
+
+def _candidate_lines(contract_code: str, line_starts: List[int]) -> Iterator[int]:
+    """Индексы строк, на которых может сработать хотя бы один паттерн уязвимости"""
+    hyperscan_db, re2_prefilter_re = _prefilter_backend()
+    
+    if hyperscan_db is not None:
+        match_ends = []
+        data = _ascii_proxy(contract_code)
+        on_match = lambda vuln_id, start, end, flags, context: match_ends.append(end)
+        try:
+            hyperscan_db.scan(data, match_event_handler=on_match)
+        except TypeError:
+            # Старые версии hyperscan (0.4) принимают в scan только bytes, а не mmap:
+            # только для них отображённый контракт копируется в память
+            if isinstance(data, bytes):
+                raise
+            match_ends.clear()
+            hyperscan_db.scan(bytes(data), match_event_handler=on_match)
+        return iter(sorted({bisect.bisect_right(line_starts, end - 1) - 1 for end in match_ends}))
+    
+    if re2_prefilter_re is not None:
+        return _search_candidate_lines(re2_prefilter_re, _ascii_proxy(contract_code), line_starts)
+    
+    master_re = MASTER_VULN_RE if isinstance(contract_code, str) else _bytes_patterns()[1]
+    return _search_candidate_lines(master_re, contract_code, line_starts)
+
+def _scan_vulnerabilities(contract_code: str) -> Tuple[List[Dict[str, Any]], float]:
+    """Поиск уязвимостей с одновременным подсчетом суммарного штрафа"""
+    # Во время сканирования накапливаются только пары (индекс паттерна, индекс строки);
+    # строки и объекты уязвимостей создаются один раз после сканирования
+    records = []
+    total_penalty = 0.0
+    
+    # В большинстве контрактов уязвимостей нет: без обязательных литералов
+    # не нужны ни смещения строк, ни DFA-движки, ни проверка паттернами
+    if not _may_contain_vulnerabilities(contract_code):
+        return [], total_penalty
+    
+    is_text = isinstance(contract_code, str)
+    compiled_patterns = COMPILED_VULN_PATTERNS if is_text else _bytes_patterns()[0]
+    
+    # Строки адресуются смещениями в исходном коде, без разбиения на список строк
+    line_starts = _line_starts(contract_code)
+    line_count = len(line_starts) - 1
+    
+    # Строки без совпадений объединенного паттерна пропускаются целиком,
+    # без проверки каждым паттерном по отдельности
+    for i in _candidate_lines(contract_code, line_starts):
+        line_start = line_starts[i]
+        line_end = line_starts[i + 1] - 1
+        
+        # На одной строке может сработать несколько паттернов,
+        # поэтому строка-кандидат проверяется каждым из них
+        for vuln_id, pattern in enumerate(compiled_patterns):
+            if pattern.search(contract_code, line_start, line_end):
+                records.append((vuln_id, i))
+                total_penalty += VULN_META[vuln_id][2]
+    
+    vulnerabilities = []
+    last_line = -1
+    line_text = context = ""
+    for vuln_id, i in records:
+        # Текст строки и контекст разделяются всеми уязвимостями этой строки
+        if i != last_line:
+            last_line = i
+            line_text = contract_code[line_starts[i]:line_starts[i + 1] - 1].strip()
+            
+            # Получение контекста (несколько строк до и после)
+            start_idx = max(0, i - 2)
+            end_idx = min(line_count, i + 3)
+            context = contract_code[line_starts[start_idx]:line_starts[end_idx] - 1]
+            
+            # Из отображённого в память контракта декодируются только эти фрагменты
+            if not is_text:
+                line_text = line_text.decode('ascii')
+                context = context.decode('ascii')
+        
+        name, severity, _ = VULN_META[vuln_id]
+        
+        # Создание объекта уязвимости
+        vulnerabilities.append({
+            "name": name,
+            "severity": severity,
+            "confidence": 0.85,
+            "lines": [
+                {
+                    "line_number": i + 1,
+                    "line": line_text,
+                    "context": context
                 }
-                
-                vulnerabilities.append(vulnerability)
+            ]
+        })
     
+    return vulnerabilities, total_penalty
+
+def find_vulnerabilities(contract_code: str) -> List[Dict[str, Any]]:
+    """Поиск уязвимостей в контракте"""
+    vulnerabilities, _ = _scan_vulnerabilities(contract_code)
     return vulnerabilities
 
 def audit_contract(contract_path: str) -> Dict[str, Any]:
     """Аудит смарт-контракта"""
-    # Чтение контракта
-    contract_code = read_contract(contract_path)
+    with _mapped_contract(contract_path) as contract_map:
+        if contract_map is not None:
+            return _audit_code(contract_map)
+    return _audit_code(read_contract(contract_path))
+
+def _audit_code(contract_code: str) -> Dict[str, Any]:
+    """Аудит исходного кода смарт-контракта"""
     if not contract_code:
         return {
             "is_vulnerable": False,
@@ -131,31 +475,14 @@ def audit_contract(contract_path: str) -> Dict[str, Any]:
             "error": "Не удалось прочитать контракт"
         }
     
-    # Поиск уязвимостей
-    vulnerabilities = find_vulnerabilities(contract_code)
+    # Поиск уязвимостей и расчет общего штрафа за один проход
+    vulnerabilities, total_penalty = _scan_vulnerabilities(contract_code)
     
     # Анализ AST-топологии
     features = analyze_ast_topology(contract_code)
     
-    # Расчет общего скора уязвимости
-    vulnerability_score = 0.0
-    if vulnerabilities:
-        # Веса для разных уровней серьезности
-        severity_weights = {
-            "critical": 0.3,
-            "high": 0.2,
-            "medium": 0.1,
-            "low": 0.05,
-            "info": 0.01
-        }
-        
-        # Расчет общего штрафа
-        total_penalty = 0.0
-        for vuln in vulnerabilities:
-            total_penalty += severity_weights.get(vuln["severity"], 0.1)
-        
-        # Ограничение максимального штрафа до 1.0
-        vulnerability_score = min(total_penalty, 1.0)
+    # Ограничение максимального штрафа до 1.0
+    vulnerability_score = min(total_penalty, 1.0)
     
     return {
         "is_vulnerable": bool(vulnerabilities),
@@ -169,7 +496,7 @@ def generate_test_cases(contract_code: str) -> List[Dict[str, Any]]:
     test_cases = []
     
     # Поиск функций в контракте
-    function_matches = re.finditer(r"function\s+(\w+)\s*\(([^)]*)\)\s*(public|external|internal|private)?\s*(view|pure|payable)?\s*(?:returns\s*\(([^)]*)\))?\s*{", contract_code)
+    function_matches = FUNCTION_SIGNATURE_RE.finditer(contract_code)
     
     for match in function_matches:
         function_name = match.group(1)
@@ -185,26 +512,23 @@ def generate_test_cases(contract_code: str) -> List[Dict[str, Any]]:
         # Парсинг параметров
         params = {}
         if params_str:
-            param_matches = re.finditer(r"(\w+)\s+(\w+)(?:\s*,\s*)?", params_str)
-            for param_match in param_matches:
-                param_type = param_match.group(1)
-                param_name = param_match.group(2)
+            # Тип - первый токен, имя - последний: между ними могут стоять
+            # memory/calldata/storage или payable
+            for param in params_str.split(','):
+                tokens = param.split()
+                if len(tokens) < 2:
+                    continue
+                param_type = tokens[0]
+                param_name = tokens[-1]
                 
-                # Генерация значения параметра в зависимости от типа
-                if param_type == "uint" or param_type.startswith("uint"):
-                    params[param_name] = 100
-                elif param_type == "int" or param_type.startswith("int"):
-                    params[param_name] = -10
-                elif param_type == "bool":
-                    params[param_name] = True
-                elif param_type == "address":
-                    params[param_name] = "0x1234567890123456789012345678901234567890"
-                elif param_type == "string":
-                    params[param_name] = "test"
-                elif param_type.startswith("bytes"):
-                    params[param_name] = "0x1234"
-                else:
-                    params[param_name] = None
+                # Генерация значения параметра в зависимости от типа;
+                # для массивов значение по умолчанию не генерируется
+                value = PARAM_EXACT_DEFAULTS.get(param_type)
+                if value is None and "[" not in param_type:
+                    prefix_default = PARAM_PREFIX_DEFAULTS.get(param_type[:1])
+                    if prefix_default is not None and param_type.startswith(prefix_default[0]):
+                        value = prefix_default[1]
+                params[param_name] = value
         
         # Создание стандартного тест-кейса
         test_cases.append({
@@ -254,9 +578,14 @@ def generate_patch(contract_code: str, vulnerability: Dict[str, Any]) -> str:
             original_line = code_lines[line_number - 1]
             indentation = re.match(r"^\s*", original_line).group(0)
             
-            # Поиск имени функции
-            function_match = re.search(r"function\s+(\w+)", '\n'.join(code_lines[:line_number]))
-            function_name = function_match.group(1) if function_match else "withdraw"
+            # Поиск имени функции, в которой находится уязвимая строка:
+            # просмотр строк в обратном порядке до ближайшего объявления
+            function_name = "withdraw"
+            for idx in range(line_number - 1, -1, -1):
+                function_names = FUNCTION_NAME_RE.findall(code_lines[idx])
+                if function_names:
+                    function_name = function_names[-1]
+                    break
             
             # Создание патча
             patch = f"""// DEP Security Patch: Защита от reentrancy атаки
@@ -363,48 +692,221 @@ function {function_name}(uint256 amount) public {{
 // 3. Рассмотрите возможность использования проверенных библиотек, таких как OpenZeppelin.
 // 4. Проведите аудит безопасности перед деплоем в основную сеть."""
 
-def main():
-    """Основная функция"""
-    parser = argparse.ArgumentParser(description='Мост между TypeScript и Python-моделью для аудита смарт-контрактов')
-    parser.add_argument('--action', choices=['audit', 'test', 'patch'], required=True, help='Действие')
-    parser.add_argument('--contract-path', required=True, help='Путь к файлу контракта')
-    parser.add_argument('--vulnerability', help='Путь к файлу с информацией о уязвимости (для патча)')
+def _orjson_dumps(result: Any, option: int = 0) -> Optional[bytes]:
+    """Сериализация через orjson, если он установлен и поддерживает все значения результата"""
+    orjson = _optional_module('orjson')
+    if orjson is None:
+        return None
+    try:
+        return orjson.dumps(result, option=option)
+    except orjson.JSONEncodeError:
+        # orjson не поддерживает целые больше 64 бит, например 2**256 - 1 в тест-кейсах
+        return None
+
+def _emit_json(result: Any) -> None:
+    """Вывод результата в stdout в формате JSON"""
+    orjson = _optional_module('orjson')
+    data = _orjson_dumps(result, orjson.OPT_INDENT_2 if orjson is not None else 0)
+    if data is None:
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+        return
     
-    args = parser.parse_args()
+    sys.stdout.flush()
+    sys.stdout.buffer.write(data + b"\n")
+    sys.stdout.flush()
+
+def _prune_cache() -> None:
+    """Удаление самых старых результатов, если их в кэше больше CACHE_MAX_ENTRIES
     
-    if args.action == 'audit':
-        # Аудит контракта
-        result = audit_contract(args.contract_path)
-        print(json.dumps(result, ensure_ascii=False, indent=2))
+    Обычно записей меньше предела, и хватает подсчета имен без stat.
+    Базы Hyperscan и кэш признаков train_model.py не затрагиваются.
+    """
+    with os.scandir(CACHE_DIR) as entries:
+        names = [entry.name for entry in entries if entry.name.endswith('.json')]
+    if len(names) <= CACHE_MAX_ENTRIES:
+        return
     
-    elif args.action == 'test':
+    # Удаляется с запасом, чтобы не сканировать директорию при каждой записи
+    files = []
+    for name in names:
+        path = os.path.join(CACHE_DIR, name)
+        try:
+            files.append((os.stat(path).st_mtime_ns, path))
+        except OSError:
+            pass
+    files.sort()
+    for _, path in files[:len(files) - CACHE_MAX_ENTRIES * 9 // 10]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+def _cached(contract_data: bytes, action: str, compute: Callable[[], Any], key: str = "",
+            use_cache: bool = True) -> Any:
+    """Кэширование результата анализа по SHA-256 содержимого контракта
+    
+    В ключ также входит время изменения этого скрипта, чтобы результаты,
+    полученные предыдущей версией анализатора, не переиспользовались.
+    При use_cache=False результат вычисляется без чтения и записи кэша.
+    """
+    if not use_cache:
+        return compute()
+    
+    digest = hashlib.sha256(contract_data)
+    digest.update(str(os.stat(__file__).st_mtime_ns).encode())
+    digest.update(key.encode())
+    cache_file = os.path.join(CACHE_DIR, f"{digest.hexdigest()}.{action}.json")
+    
+    try:
+        # Чтение через json: orjson.loads превращает целые больше 64 бит во float
+        with open(cache_file, 'rb') as f:
+            return json.loads(f.read())
+    except (OSError, ValueError):
+        pass
+    
+    result = compute()
+    
+    try:
+        data = _orjson_dumps(result)
+        if data is None:
+            data = json.dumps(result, ensure_ascii=False).encode('utf-8')
+        _write_atomic(cache_file, data)
+        _prune_cache()
+    except OSError:
+        pass
+    
+    return result
+
+def _parse_fast_argv(argv: List[str]) -> Optional[Tuple[str, str, Optional[str]]]:
+    """Разбор стандартной формы вызова из TypeScript без argparse
+    
+    Поддерживается только "--action A --contract-path P [--vulnerability V]";
+    для всего остального возвращается None и используется argparse.
+    """
+    if len(argv) not in (4, 6):
+        return None
+    if argv[0] != '--action' or argv[1] not in ACTIONS or argv[2] != '--contract-path':
+        return None
+    if len(argv) == 6 and argv[4] != '--vulnerability':
+        return None
+    
+    # Значения, похожие на опции, argparse отвергает - пусть он и сообщит об ошибке
+    values = argv[3::2]
+    if any(value.startswith('-') for value in values):
+        return None
+    
+    return argv[1], argv[3], argv[5] if len(argv) == 6 else None
+
+def _audit_path(contract_path: str, use_cache: bool = True) -> Dict[str, Any]:
+    """Аудит контракта по пути с использованием кэша"""
+    with _mapped_contract(contract_path) as contract_map:
+        if contract_map is not None:
+            return _cached(contract_map, 'audit', lambda: _audit_code(contract_map), use_cache=use_cache)
+    
+    contract_data, contract_code = _load_contract(contract_path)
+    if contract_code:
+        return _cached(contract_data, 'audit', lambda: _audit_code(contract_code), use_cache=use_cache)
+    return _audit_code(contract_code)
+
+def _expand_batch_paths(paths: List[str]) -> List[str]:
+    """Раскрытие директорий в списке путей в файлы *.sol"""
+    contract_paths = []
+    for path in paths:
+        if os.path.isdir(path):
+            contract_paths.extend(sorted(
+                entry.path for entry in os.scandir(path)
+                if entry.name.endswith('.sol') and entry.is_file()
+            ))
+        else:
+            contract_paths.append(path)
+    return contract_paths
+
+def audit_batch(contract_paths: List[str], use_cache: bool = True) -> Dict[str, Dict[str, Any]]:
+    """Аудит нескольких контрактов за один запуск интерпретатора"""
+    audit_path = functools.partial(_audit_path, use_cache=use_cache)
+    if len(contract_paths) < BATCH_PARALLEL_THRESHOLD:
+        # На малых пакетах запуск пула процессов дороже самого аудита
+        results = [audit_path(path) for path in contract_paths]
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        
+        workers = os.cpu_count() or 1
+        chunksize = max(1, len(contract_paths) // (4 * workers))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(audit_path, contract_paths, chunksize=chunksize))
+    
+    return dict(zip(contract_paths, results))
+
+def _dispatch(action: str, contract_path: str, vulnerability_path: Optional[str],
+              use_cache: bool = True) -> None:
+    """Выполнение действия и вывод результата"""
+    if action == 'audit':
+        # Аудит контракта (большие контракты сканируются через mmap)
+        _emit_json(_audit_path(contract_path, use_cache))
+        return
+    
+    # Контракт читается один раз: те же байты идут и в ключ кэша, и в анализ
+    contract_data, contract_code = _load_contract(contract_path)
+    
+    if action == 'test':
         # Генерация тест-кейсов
-        contract_code = read_contract(args.contract_path)
         if contract_code:
-            test_cases = generate_test_cases(contract_code)
-            print(json.dumps(test_cases, ensure_ascii=False, indent=2))
+            test_cases = _cached(contract_data, 'test', lambda: generate_test_cases(contract_code), use_cache=use_cache)
+            _emit_json(test_cases)
         else:
-            print(json.dumps([], ensure_ascii=False, indent=2))
+            _emit_json([])
     
-    elif args.action == 'patch':
+    elif action == 'patch':
         # Генерация патча
-        contract_code = read_contract(args.contract_path)
         if not contract_code:
             print("// Не удалось прочитать контракт")
             return
         
-        if not args.vulnerability:
+        if not vulnerability_path:
             print("// Не указан путь к файлу с информацией о уязвимости")
             return
         
         try:
-            with open(args.vulnerability, 'r', encoding='utf-8') as f:
+            with open(vulnerability_path, 'r', encoding='utf-8') as f:
                 vulnerability = json.load(f)
             
-            patch = generate_patch(contract_code, vulnerability)
+            vulnerability_key = hashlib.sha256(json.dumps(vulnerability, sort_keys=True).encode()).hexdigest()
+            patch = _cached(contract_data, 'patch', lambda: generate_patch(contract_code, vulnerability),
+                            vulnerability_key, use_cache)
             print(patch)
         except Exception as e:
             print(f"// Ошибка при генерации патча: {e}")
 
+def main():
+    """Основная функция"""
+    # Быстрый путь для вызовов из TypeScript: argparse импортируется
+    # и настраивается только для --help и нестандартных аргументов
+    fast_args = _parse_fast_argv(sys.argv[1:])
+    if fast_args is not None:
+        _dispatch(*fast_args)
+        return
+    
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Мост между TypeScript и Python-моделью для аудита смарт-контрактов')
+    parser.add_argument('--action', choices=ACTIONS, required=True, help='Действие')
+    parser.add_argument('--contract-path', help='Путь к файлу контракта')
+    parser.add_argument('--vulnerability', help='Путь к файлу с информацией о уязвимости (для патча)')
+    parser.add_argument('--batch', nargs='*', metavar='PATH',
+                        help='Пакетный аудит: пути к контрактам или директориям (без аргументов - список путей из stdin)')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Не читать и не сохранять результаты в кэше model/.cache')
+    
+    args = parser.parse_args()
+    if args.batch is not None:
+        if args.action != 'audit':
+            parser.error('--batch поддерживается только для --action audit')
+        paths = args.batch or [line.strip() for line in sys.stdin if line.strip()]
+        _emit_json(audit_batch(_expand_batch_paths(paths), not args.no_cache))
+        return
+    if args.contract_path is None:
+        parser.error('не указан --contract-path (или --batch для пакетного аудита)')
+    _dispatch(args.action, args.contract_path, args.vulnerability, not args.no_cache)
+
 if __name__ == "__main__":
     main()
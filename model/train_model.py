@@ -7,33 +7,51 @@ train_model.py - Скрипт для обучения модели Neuro-Solidit
 Этот скрипт обучает нейронную сеть для обнаружения уязвимостей в смарт-контрактах Solidity.
 """
 
+from __future__ import annotations
+
 import os
 import sys
 import json
 import argparse
-import glob
+import hashlib
+import multiprocessing
 import re
+from collections import Counter
 import numpy as np
-import pandas as pd
-import tensorflow as tf
-from tensorflow.keras import layers, models, optimizers
-from tensorflow.keras.callbacks import ModelCheckpoint, EarlyStopping, ReduceLROnPlateau
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import StandardScaler
-from sklearn.metrics import classification_report, confusion_matrix, precision_recall_fscore_support
-import matplotlib.pyplot as plt
-from typing import Dict, List, Any, Tuple, Optional
+from typing import TYPE_CHECKING, List, Any, Iterator, Tuple, Optional
+
+# TensorFlow, scikit-learn и matplotlib импортируются в функциях, где они
+# нужны: --help и извлечение признаков в процессах пула обходятся без них
+if TYPE_CHECKING:
+    import tensorflow as tf
 from moonlight_ai import MoonlightOptimizer  # Импорт оптимизатора Moonlight
 
+# Необязательный DFA-движок для подсчета ключевых слов и вызовов за один проход
+try:
+    import hyperscan
+except ImportError:
+    hyperscan = None
+
+# Необязательный автомат Ахо-Корасик для того же подсчета, когда Hyperscan
+# недоступен или текст не ASCII
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
 # Константы
 MODEL_DIR = os.path.dirname(os.path.abspath(__file__))
 DEFAULT_DATA_DIR = os.path.join(MODEL_DIR, '..', 'data', 'verified_contracts')
 DEFAULT_OUTPUT_DIR = os.path.join(MODEL_DIR, 'neuro_auditor_model')
+CACHE_DIR = os.path.join(MODEL_DIR, '.cache')
 DEFAULT_EPOCHS = 100
 DEFAULT_BATCH_SIZE = 32
 DEFAULT_LEARNING_RATE = 0.001
 DEFAULT_VALIDATION_SPLIT = 0.2
 DEFAULT_TEST_SPLIT = 0.1
+DEFAULT_WORKERS = max(1, (os.cpu_count() or 1) - 1)
+# Начиная с этого размера контракта совпадения считаются без построения списка
+FINDITER_MIN_SIZE = 1 << 20
 
 # Паттерны для поиска уязвимостей
 VULNERABILITY_PATTERNS = {
@@ -44,6 +62,185 @@ VULNERABILITY_PATTERNS = {
     "unsecured_selfdestruct": r"selfdestruct|suicide"
 }
 
+# Ключевые слова, операторы и вызовы функций, количество которых входит в признаки
+KEYWORDS = ['function', 'contract', 'modifier', 'event', 'struct', 'enum',
+            'mapping', 'address', 'uint', 'int', 'bool', 'string', 'bytes',
+            'public', 'private', 'internal', 'external', 'view', 'pure',
+            'payable', 'virtual', 'override', 'abstract', 'interface']
+
+OPERATORS = ['+', '-', '*', '/', '=', '==', '!=', '<', '>', '<=', '>=',
+             '&&', '||', '!', '++', '--', '+=', '-=', '*=', '/=']
+
+FUNCTION_CALLS = ['transfer', 'send', 'call', 'delegatecall', 'staticcall',
+                  'require', 'assert', 'revert', 'selfdestruct', 'suicide']
+
+# Ключевые слова и вызовы считаются одним проходом объединенного паттерна:
+# совпадения - целые слова, поэтому они не пересекаются между собой
+KEYWORD_RE = re.compile(r'\b(' + '|'.join(KEYWORDS) + r')\b')
+FUNCTION_CALL_RE = re.compile(
+    r'\.(' + '|'.join(FUNCTION_CALLS) + r')\b|\b(' + '|'.join(FUNCTION_CALLS) + r')\s*\('
+)
+
+# Скомпилированные паттерны уязвимостей (компилируются один раз при импорте)
+COMPILED_VULN_PATTERNS = tuple(
+    re.compile(pattern, re.IGNORECASE)
+    for pattern in VULNERABILITY_PATTERNS.values()
+)
+
+# Литералы (в нижнем регистре), хотя бы один из которых обязательно входит
+# в совпадение паттерна уязвимости
+VULNERABILITY_REQUIRED_LITERALS = {
+    "reentrancy": ("call",),
+    "integer_overflow": ("+",),
+    "unchecked_return": (".call",),
+    "tx_origin": ("tx.origin",),
+    "unsecured_selfdestruct": ("selfdestruct", "suicide")
+}
+VULN_CHECKS = tuple(
+    (compiled, VULNERABILITY_REQUIRED_LITERALS[name])
+    for name, compiled in zip(VULNERABILITY_PATTERNS, COMPILED_VULN_PATTERNS)
+)
+
+# Паттерны для подсчета элементов контракта
+FUNCTION_RE = re.compile(r'function\s+\w+\s*\(')
+STATE_VAR_RE = re.compile(r'(uint|int|bool|address|string|bytes|mapping)\s+\w+')
+MODIFIER_RE = re.compile(r'modifier\s+\w+\s*\(')
+EVENT_RE = re.compile(r'event\s+\w+\s*\(')
+
+def _count_matches(pattern: re.Pattern, contract: str) -> int:
+    """Число непересекающихся совпадений паттерна в контракте
+    
+    len(findall) быстрее, но держит в памяти список всех совпадений: на
+    больших контрактах совпадения перебираются через finditer.
+    """
+    if len(contract) < FINDITER_MIN_SIZE:
+        return len(pattern.findall(contract))
+    return sum(1 for _ in pattern.finditer(contract))
+
+# ASCII-символы, которые \s в re считает пробельными, а Hyperscan - нет
+_SPACE_PROXIES = bytes.maketrans(b"\x0b\x1c\x1d\x1e\x1f", b"     ")
+
+def _build_hyperscan_db() -> Any:
+    """База Hyperscan: ключевые слова, затем вызовы вида .f и вызовы вида f(
+    
+    Для вызовов вида f( запрашивается начало совпадения, чтобы отбросить
+    вызовы .f(, которые уже учтены паттерном \\.f\\b.
+    """
+    expressions = (
+        [rf'\b{keyword}\b' for keyword in KEYWORDS]
+        + [rf'\.{func}\b' for func in FUNCTION_CALLS]
+        + [rf'\b{func}\s*\(' for func in FUNCTION_CALLS]
+    )
+    flags = [0] * (len(KEYWORDS) + len(FUNCTION_CALLS)) + [hyperscan.HS_FLAG_SOM_LEFTMOST] * len(FUNCTION_CALLS)
+    db = hyperscan.Database()
+    db.compile(
+        expressions=[expression.encode() for expression in expressions],
+        ids=list(range(len(expressions))),
+        elements=len(expressions),
+        flags=flags
+    )
+    return db
+
+HYPERSCAN_DB = _build_hyperscan_db() if hyperscan is not None else None
+
+def _hyperscan_counts(contract: str) -> Tuple[Counter, Counter]:
+    """Подсчет ключевых слов и вызовов функций одним проходом Hyperscan (только для ASCII-текста)"""
+    data = contract.encode('ascii').translate(_SPACE_PROXIES)
+    keyword_counts = Counter()
+    call_counts = Counter()
+    call_form_start = len(KEYWORDS) + len(FUNCTION_CALLS)
+    
+    def on_match(pattern_id: int, start: int, end: int, flags: int, context: Any) -> None:
+        if pattern_id < len(KEYWORDS):
+            keyword_counts[KEYWORDS[pattern_id]] += 1
+        elif pattern_id < call_form_start:
+            call_counts[FUNCTION_CALLS[pattern_id - len(KEYWORDS)]] += 1
+        elif start == 0 or data[start - 1] != ord('.'):
+            # Hyperscan сообщает и пересекающиеся совпадения, а re в ".f(" находит только ".f"
+            call_counts[FUNCTION_CALLS[pattern_id - call_form_start]] += 1
+    
+    HYPERSCAN_DB.scan(data, match_event_handler=on_match)
+    return keyword_counts, call_counts
+
+def _build_ahocorasick_automaton() -> Any:
+    """Автомат Ахо-Корасик по ключевым словам и именам вызываемых функций"""
+    automaton = ahocorasick.Automaton()
+    for keyword in KEYWORDS:
+        automaton.add_word(keyword, (True, keyword, len(keyword)))
+    for func in FUNCTION_CALLS:
+        automaton.add_word(func, (False, func, len(func)))
+    automaton.make_automaton()
+    return automaton
+
+AHOCORASICK_AUTOMATON = _build_ahocorasick_automaton() if ahocorasick is not None else None
+
+def _is_word_char(char: str) -> bool:
+    """Символ \\w в смысле re для str-паттернов"""
+    return char.isalnum() or char == '_'
+
+def _ahocorasick_counts(contract: str) -> Tuple[Counter, Counter]:
+    """Подсчет ключевых слов и вызовов функций одним проходом автомата
+    
+    Все искомые строки состоят из символов \\w, поэтому совпадение с границами
+    слова с обеих сторон - целое слово, и самых длинных непересекающихся
+    совпадений (iter_long) достаточно. Результат совпадает с KEYWORD_RE и
+    FUNCTION_CALL_RE на любом тексте, включая не-ASCII.
+    """
+    keyword_counts = Counter()
+    call_counts = Counter()
+    size = len(contract)
+    
+    for end, (is_keyword, word, length) in AHOCORASICK_AUTOMATON.iter_long(contract):
+        after = end + 1
+        if after < size and _is_word_char(contract[after]):
+            continue
+        start = end - length + 1
+        before = contract[start - 1] if start else ''
+        if is_keyword:
+            if not (before and _is_word_char(before)):
+                keyword_counts[word] += 1
+        elif before == '.':
+            # Вызов вида .f
+            call_counts[word] += 1
+        elif not (before and _is_word_char(before)):
+            # Вызов вида f(
+            while after < size and contract[after].isspace():
+                after += 1
+            if after < size and contract[after] == '(':
+                call_counts[word] += 1
+    return keyword_counts, call_counts
+
+# Порядок признаков в строке матрицы признаков
+FEATURE_NAMES = (
+    ['length', 'line_count']
+    + [f'count_{keyword}' for keyword in KEYWORDS]
+    + [f'count_op_{operator}' for operator in OPERATORS]
+    + [f'count_call_{func}' for func in FUNCTION_CALLS]
+    + ['function_count', 'state_vars_count', 'modifier_count', 'event_count', 'complexity']
+)
+FEATURE_INDEX = {name: index for index, name in enumerate(FEATURE_NAMES)}
+
+# Вклад признаков в оценку сложности контракта
+COMPLEXITY_TERMS = {
+    'function_count': 2,
+    'state_vars_count': 1,
+    'modifier_count': 1.5,
+    'event_count': 1,
+    'count_op_&&': 1,
+    'count_op_||': 1,
+    'count_op_!': 1,
+    'count_call_require': 1,
+    'count_call_assert': 1,
+    'count_call_revert': 1,
+}
+COMPLEXITY_WEIGHTS = np.zeros(len(FEATURE_NAMES), dtype=np.float32)
+COMPLEXITY_WEIGHTS[[FEATURE_INDEX[name] for name in COMPLEXITY_TERMS]] = list(COMPLEXITY_TERMS.values())
+
+# Столбцы групп признаков, заполняемых одним присваиванием
+KEYWORD_COLUMNS = slice(FEATURE_INDEX[f'count_{KEYWORDS[0]}'], FEATURE_INDEX[f'count_{KEYWORDS[-1]}'] + 1)
+OPERATOR_COLUMNS = slice(FEATURE_INDEX[f'count_op_{OPERATORS[0]}'], FEATURE_INDEX[f'count_op_{OPERATORS[-1]}'] + 1)
+FUNCTION_CALL_COLUMNS = slice(FEATURE_INDEX[f'count_call_{FUNCTION_CALLS[0]}'], FEATURE_INDEX[f'count_call_{FUNCTION_CALLS[-1]}'] + 1)
+
 def setup_argparse() -> argparse.Namespace:
     """Настройка аргументов командной строки"""
     parser = argparse.ArgumentParser(description='Обучение модели Neuro-Solidity Auditor')
@@ -61,8 +258,14 @@ def setup_argparse() -> argparse.Namespace:
                         help=f'Доля данных для валидации (по умолчанию: {DEFAULT_VALIDATION_SPLIT})')
     parser.add_argument('--test-split', type=float, default=DEFAULT_TEST_SPLIT,
                         help=f'Доля данных для тестирования (по умолчанию: {DEFAULT_TEST_SPLIT})')
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help=f'Количество процессов для извлечения признаков (по умолчанию: {DEFAULT_WORKERS})')
+    parser.add_argument('--no-feature-cache', action='store_true',
+                        help=f'Не использовать кэш признаков в {CACHE_DIR}')
     parser.add_argument('--no-gpu', action='store_true',
                         help='Отключить использование GPU')
+    parser.add_argument('--mixed-precision', action='store_true',
+                        help='Обучение в смешанной точности mixed_float16 (для GPU с тензорными ядрами)')
     parser.add_argument('--use-moonlight', action='store_true',
                         help='Использовать оптимизатор Moonlight вместо Adam')
     parser.add_argument('--moonlight-warmup', type=int, default=1000,
@@ -72,6 +275,8 @@ def setup_argparse() -> argparse.Namespace:
 
 def configure_gpu(use_gpu: bool = True) -> None:
     """Настройка GPU"""
+    import tensorflow as tf
+    
     if not use_gpu:
         print("Отключение GPU...")
         os.environ["CUDA_VISIBLE_DEVICES"] = "-1"
@@ -93,123 +298,195 @@ def configure_gpu(use_gpu: bool = True) -> None:
         except RuntimeError as e:
             print(f"Ошибка при настройке GPU: {e}")
 
-def load_contracts(data_dir: str) -> List[str]:
-    """Загрузка контрактов из директории"""
-    contract_files = glob.glob(os.path.join(data_dir, '*.sol'))
+def find_contracts(data_dir: str) -> List[str]:
+    """Поиск файлов контрактов в директории"""
+    # Один проход scandir вместо glob; как и glob('*.sol'), скрытые файлы
+    # пропускаются. Сортировка: порядок образцов (и разбиение на выборки)
+    # не зависит от файловой системы
+    try:
+        with os.scandir(data_dir) as entries:
+            contract_files = sorted(
+                entry.path for entry in entries
+                if entry.name.endswith('.sol') and not entry.name.startswith('.') and entry.is_file()
+            )
+    except OSError:
+        contract_files = []
     print(f"Найдено {len(contract_files)} контрактов в {data_dir}")
-    
-    contracts = []
-    for file_path in contract_files:
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                contracts.append(f.read())
-        except Exception as e:
-            print(f"Ошибка при чтении {file_path}: {e}")
-    
-    print(f"Загружено {len(contracts)} контрактов")
-    return contracts
+    return contract_files
+
+def _load_and_featurize(file_path: str) -> Optional[Tuple[np.ndarray, int]]:
+    """Чтение контракта и извлечение строки признаков вместе с меткой (выполняется в процессах пула)"""
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            contract = f.read()
+    except Exception as e:
+        print(f"Ошибка при чтении {file_path}: {e}")
+        return None
+    
+    row = np.empty(len(FEATURE_NAMES), dtype=np.float32)
+    extract_features(contract, row)
+    return row, contract_label(contract)
+
+def load_contracts(contract_files: List[str], workers: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+    """Загрузка контрактов и извлечение признаков в нескольких процессах"""
+    if workers > 1 and len(contract_files) > 1:
+        # imap сохраняет порядок файлов, чтобы разбиение на выборки было воспроизводимым
+        chunksize = max(1, len(contract_files) // (4 * workers))
+        with multiprocessing.Pool(workers) as pool:
+            results = pool.imap(_load_and_featurize, contract_files, chunksize=chunksize)
+            X, y = _collect_rows(results, len(contract_files))
+    else:
+        X, y = _collect_rows(map(_load_and_featurize, contract_files), len(contract_files))
+    
+    print(f"Загружено {len(X)} контрактов")
+    add_complexity(X)
+    return X, y
+
+def _collect_rows(results: Iterator[Optional[Tuple[np.ndarray, int]]], count: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Заполнение заранее выделенной матрицы признаков строками по мере их готовности"""
+    X = np.empty((count, len(FEATURE_NAMES)), dtype=np.float32)
+    y = np.empty(count, dtype=np.int64)
+    loaded = 0
+    for result in results:
+        if result is None:
+            continue
+        X[loaded], y[loaded] = result
+        loaded += 1
+    return X[:loaded], y[:loaded]
+
+def add_complexity(X: np.ndarray) -> None:
+    """Оценка сложности всех контрактов одним умножением матрицы признаков на вектор весов"""
+    column = FEATURE_INDEX['complexity']
+    # Столбец не заполнен при извлечении признаков и обнуляется до умножения
+    X[:, column] = 0
+    X[:, column] = X @ COMPLEXITY_WEIGHTS
 
-def extract_features(contract: str) -> Dict[str, Any]:
-    """Извлечение признаков из контракта"""
-    features = {}
+def extract_features(contract: str, out_row: np.ndarray) -> None:
+    """Извлечение признаков из контракта в строку матрицы признаков
     
+    Столбец complexity заполняется позже для всей матрицы сразу (add_complexity).
+    """
     # Базовые статистические признаки
-    features['length'] = len(contract)
-    features['line_count'] = contract.count('\n') + 1
-    
-    # Подсчет ключевых слов
-    keywords = ['function', 'contract', 'modifier', 'event', 'struct', 'enum',
-                'mapping', 'address', 'uint', 'int', 'bool', 'string', 'bytes',
-                'public', 'private', 'internal', 'external', 'view', 'pure',
-                'payable', 'virtual', 'override', 'abstract', 'interface']
-    
-    for keyword in keywords:
-        pattern = r'\b' + keyword + r'\b'
-        features[f'count_{keyword}'] = len(re.findall(pattern, contract))
-    
-    # Подсчет операторов
-    operators = ['+', '-', '*', '/', '=', '==', '!=', '<', '>', '<=', '>=',
-                 '&&', '||', '!', '++', '--', '+=', '-=', '*=', '/=']
-    
-    for operator in operators:
-        # Экранирование специальных символов в регулярных выражениях
-        escaped_operator = re.escape(operator)
-        features[f'count_op_{operator}'] = len(re.findall(escaped_operator, contract))
-    
-    # Подсчет вызовов функций
-    function_calls = ['transfer', 'send', 'call', 'delegatecall', 'staticcall',
-                      'require', 'assert', 'revert', 'selfdestruct', 'suicide']
-    
-    for func in function_calls:
-        pattern = r'\.' + func + r'\b|\b' + func + r'\s*\('
-        features[f'count_call_{func}'] = len(re.findall(pattern, contract))
-    
-    # Подсчет уязвимостей
-    for vuln_name, pattern in VULNERABILITY_PATTERNS.items():
-        features[f'has_{vuln_name}'] = 1 if re.search(pattern, contract, re.IGNORECASE) else 0
+    out_row[FEATURE_INDEX['length']] = len(contract)
+    out_row[FEATURE_INDEX['line_count']] = contract.count('\n') + 1
+    
+    # Подсчет ключевых слов и вызовов функций: \b и \w в Hyperscan
+    # совпадают с re только на ASCII-тексте
+    if HYPERSCAN_DB is not None and contract.isascii():
+        keyword_counts, call_counts = _hyperscan_counts(contract)
+    elif AHOCORASICK_AUTOMATON is not None:
+        keyword_counts, call_counts = _ahocorasick_counts(contract)
+    else:
+        keyword_counts = Counter(KEYWORD_RE.findall(contract))
+        call_counts = Counter(method or func for method, func in FUNCTION_CALL_RE.findall(contract))
+    
+    out_row[KEYWORD_COLUMNS] = [keyword_counts[keyword] for keyword in KEYWORDS]
+    out_row[FUNCTION_CALL_COLUMNS] = [call_counts[func] for func in FUNCTION_CALLS]
+    
+    # Подсчет операторов: вхождения считаются независимо для каждого оператора
+    # ('+' учитывается и внутри '++'), поэтому общий паттерн здесь не подходит
+    out_row[OPERATOR_COLUMNS] = [contract.count(operator) for operator in OPERATORS]
     
     # Подсчет функций
-    features['function_count'] = len(re.findall(r'function\s+\w+\s*\(', contract))
+    function_count = _count_matches(FUNCTION_RE, contract)
     
     # Подсчет переменных состояния
-    features['state_vars_count'] = len(re.findall(r'(uint|int|bool|address|string|bytes|mapping)\s+\w+', contract))
+    state_vars_count = _count_matches(STATE_VAR_RE, contract)
     
     # Подсчет модификаторов
-    features['modifier_count'] = len(re.findall(r'modifier\s+\w+\s*\(', contract))
+    modifier_count = _count_matches(MODIFIER_RE, contract)
     
     # Подсчет событий
-    features['event_count'] = len(re.findall(r'event\s+\w+\s*\(', contract))
-    
-    # Оценка сложности контракта
-    complexity = 0
-    complexity += features['function_count'] * 2
-    complexity += features['state_vars_count']
-    complexity += features['modifier_count'] * 1.5
-    complexity += features['event_count']
-    complexity += sum(features[f'count_op_{op}'] for op in ['&&', '||', '!'])
-    complexity += sum(features[f'count_call_{func}'] for func in ['require', 'assert', 'revert'])
+    event_count = _count_matches(EVENT_RE, contract)
     
-    features['complexity'] = complexity
-    
-    return features
+    out_row[FEATURE_INDEX['function_count']] = function_count
+    out_row[FEATURE_INDEX['state_vars_count']] = state_vars_count
+    out_row[FEATURE_INDEX['modifier_count']] = modifier_count
+    out_row[FEATURE_INDEX['event_count']] = event_count
 
-def prepare_dataset(contracts: List[str]) -> Tuple[np.ndarray, np.ndarray]:
-    """Подготовка датасета для обучения"""
-    print("Подготовка датасета...")
-    
-    # Извлечение признаков
-    features_list = []
-    labels = []
+def contract_label(contract: str) -> int:
+    """Метка контракта: 1, если найден хотя бы один паттерн уязвимости
+    
+    Метка не входит в признаки, чтобы модель не читерила. Паттерн ищется,
+    только если в тексте есть его обязательный литерал: на чистых контрактах
+    поиск по большинству паттернов не запускается. Для не-ASCII текста
+    проверка пропускается, потому что re.IGNORECASE сопоставляет, например,
+    'ſ' с 's', а str.lower() - нет.
+    """
+    if not contract.isascii():
+        return 1 if any(pattern.search(contract) for pattern in COMPILED_VULN_PATTERNS) else 0
+    
+    lowered = contract.lower()
+    return 1 if any(
+        any(literal in lowered for literal in literals) and pattern.search(contract)
+        for pattern, literals in VULN_CHECKS
+    ) else 0
+
+def _feature_cache_key(contract_files: List[str]) -> str:
+    """Ключ кэша признаков: пути, размеры и время изменения контрактов и этого скрипта"""
+    digest = hashlib.sha256(str(os.stat(__file__).st_mtime_ns).encode())
+    for file_path in contract_files:
+        stat = os.stat(file_path)
+        digest.update(f"{os.path.abspath(file_path)}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode())
+    return digest.hexdigest()
+
+def _save_array(path: str, array: np.ndarray) -> None:
+    """Атомарное сохранение массива в .npy"""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        np.save(f, array)
+    os.replace(tmp_path, path)
+
+def load_dataset(contract_files: List[str], workers: int = 1, use_cache: bool = True) -> Tuple[np.ndarray, np.ndarray]:
+    """Матрица признаков и метки из кэша на диске, а при его отсутствии - из контрактов"""
+    cache_prefix = os.path.join(CACHE_DIR, f"features_{_feature_cache_key(contract_files)}")
     
-    for contract in contracts:
-        features = extract_features(contract)
-        features_list.append(features)
+    if use_cache:
+        try:
+            # mmap_mode='c': признаки читаются с диска по мере обращения,
+            # а изменения в памяти не затрагивают файл кэша
+            X = np.load(f"{cache_prefix}.X.npy", mmap_mode='c')
+            y = np.load(f"{cache_prefix}.y.npy")
+            print(f"Признаки загружены из кэша: {len(X)} образцов")
+        except (OSError, ValueError):
+            X = None
+    
+    if not use_cache or X is None:
+        X, y = load_contracts(contract_files, workers)
         
-        # Определение метки (есть ли уязвимости)
-        has_vulnerability = any(features[f'has_{vuln_name}'] for vuln_name in VULNERABILITY_PATTERNS.keys())
-        labels.append(1 if has_vulnerability else 0)
+        if use_cache and len(X):
+            try:
+                os.makedirs(CACHE_DIR, exist_ok=True)
+                _save_array(f"{cache_prefix}.y.npy", y)
+                _save_array(f"{cache_prefix}.X.npy", X)
+            except OSError as e:
+                print(f"Не удалось сохранить кэш признаков: {e}")
+    
+    # Признаки не нормализуются здесь: это делает первый слой модели (create_model)
+    if len(X):
+        print(f"Подготовлено {len(X)} образцов, {sum(y)} с уязвимостями ({sum(y)/len(y)*100:.1f}%)")
     
-    # Преобразование списка словарей в DataFrame
-    df = pd.DataFrame(features_list)
-    
-    # Удаление признаков с метками уязвимостей (чтобы модель не читерила)
-    for vuln_name in VULNERABILITY_PATTERNS.keys():
-        if f'has_{vuln_name}' in df.columns:
-            df = df.drop(f'has_{vuln_name}', axis=1)
+    return X, y
+
+def create_model(X_train: np.ndarray) -> tf.keras.Model:
+    """Создание модели нейронной сети
     
-    # Нормализация признаков
-    scaler = StandardScaler()
-    X = scaler.fit_transform(df)
-    y = np.array(labels)
+    Первый слой нормализует признаки по статистикам обучающей выборки, поэтому
+    сохраненная модель (H5, TensorFlow.js, TFLite) принимает признаки как есть.
+    """
+    from tensorflow.keras import layers, models
     
-    print(f"Подготовлено {len(X)} образцов, {sum(y)} с уязвимостями ({sum(y)/len(y)*100:.1f}%)")
+    # Статистики считаются так же, как в StandardScaler: признаки с нулевым
+    # разбросом только центрируются (adapt() делил бы их на epsilon)
+    mean = X_train.mean(axis=0, dtype=np.float64)
+    variance = X_train.var(axis=0, dtype=np.float64)
+    variance[variance == 0] = 1.0
     
-    return X, y
-
-def create_model(input_dim: int) -> tf.keras.Model:
-    """Создание модели нейронной сети"""
     model = models.Sequential([
-        layers.Input(shape=(input_dim,)),
+        layers.Input(shape=(X_train.shape[1],)),
+        # Нормализация в float32 и при mixed_float16: значения признаков
+        # (длина контракта) выходят за точность float16
+        layers.Normalization(axis=-1, mean=mean, variance=variance, dtype='float32'),
         layers.Dense(128, activation='relu'),
         layers.BatchNormalization(),
         layers.Dropout(0.3),
@@ -219,13 +496,41 @@ def create_model(input_dim: int) -> tf.keras.Model:
         layers.Dense(32, activation='relu'),
         layers.BatchNormalization(),
         layers.Dropout(0.3),
-        layers.Dense(1, activation='sigmoid')
+        # Выход всегда в float32: сигмоида и функция потерь численно устойчивы и при mixed_float16
+        layers.Dense(1, activation='sigmoid', dtype='float32')
     ])
     
     return model
 
+def make_dataset(X: np.ndarray, y: np.ndarray, batch_size: int, shuffle: bool = False) -> tf.data.Dataset:
+    """Конвейер tf.data: подготовка следующего батча идет параллельно с шагом обучения
+    
+    Обучающая выборка (shuffle=True) отбрасывает неполный последний батч: форма
+    батча постоянна, и XLA компилирует шаг обучения один раз.
+    """
+    import tensorflow as tf
+    
+    dataset = tf.data.Dataset.from_tensor_slices((X, y))
+    if shuffle:
+        # Буфер на всю выборку: перемешивание каждую эпоху, как у model.fit по массивам
+        dataset = dataset.shuffle(len(X), seed=42, reshuffle_each_iteration=True)
+    # Выборка меньше одного батча не отбрасывается целиком
+    drop_remainder = shuffle and len(X) >= batch_size
+    dataset = dataset.batch(batch_size, drop_remainder=drop_remainder)
+    if not shuffle:
+        # Батчи без перемешивания одинаковы в каждой эпохе: со второй эпохи
+        # они берутся из памяти готовыми
+        dataset = dataset.cache()
+    return dataset.prefetch(tf.data.AUTOTUNE)
+
 def train_model(X: np.ndarray, y: np.ndarray, args: argparse.Namespace) -> tf.keras.Model:
     """Обучение модели"""
+    import tensorflow as tf
+    from tensorflow.keras import optimizers, mixed_precision
+    from tensorflow.keras.callbacks import ModelCheckpoint, EarlyStopping, ReduceLROnPlateau
+    from sklearn.model_selection import train_test_split
+    from sklearn.metrics import classification_report, confusion_matrix
+    
     print("Разделение данных на обучающую, валидационную и тестовую выборки...")
     
     # Разделение на обучающую и тестовую выборки
@@ -244,14 +549,22 @@ def train_model(X: np.ndarray, y: np.ndarray, args: argparse.Namespace) -> tf.ke
     
     # Создание модели
     print("Создание модели...")
-    model = create_model(X_train.shape[1])
+    model = create_model(X_train)
     
     # Компиляция модели
+    optimizer = optimizers.Adam(learning_rate=args.learning_rate)
+    if args.mixed_precision:
+        # Масштабирование потерь защищает градиенты float16 от обнуления
+        optimizer = mixed_precision.LossScaleOptimizer(optimizer)
+    
     model.compile(
-        optimizer=optimizers.Adam(learning_rate=args.learning_rate),
+        optimizer=optimizer,
         loss='binary_crossentropy',
         metrics=['accuracy', tf.keras.metrics.Precision(), tf.keras.metrics.Recall(), 
-                 tf.keras.metrics.AUC()]
+                 tf.keras.metrics.AUC()],
+        # XLA объединяет Dense, BatchNormalization и Dropout в общие ядра:
+        # для такой небольшой сети накладные расходы на запуск операций больше самих вычислений
+        jit_compile=True
     )
     
     # Вывод информации о модели
@@ -286,10 +599,9 @@ def train_model(X: np.ndarray, y: np.ndarray, args: argparse.Namespace) -> tf.ke
     # Обучение модели
     print(f"Обучение модели на {len(X_train)} образцах...")
     history = model.fit(
-        X_train, y_train,
+        make_dataset(X_train, y_train, args.batch_size, shuffle=True),
         epochs=args.epochs,
-        batch_size=args.batch_size,
-        validation_data=(X_val, y_val),
+        validation_data=make_dataset(X_val, y_val, args.batch_size),
         callbacks=callbacks,
         verbose=1
     )
@@ -303,7 +615,9 @@ def train_model(X: np.ndarray, y: np.ndarray, args: argparse.Namespace) -> tf.ke
     print(f"Тестовая AUC: {test_auc:.4f}")
     
     # Предсказания на тестовой выборке
-    y_pred_prob = model.predict(X_test)
+    # Прямой вызов модели на всей выборке: без цикла по батчам и построения
+    # отдельной функции предсказания, как в model.predict
+    y_pred_prob = model(tf.constant(X_test, dtype=tf.float32), training=False).numpy()
     y_pred = (y_pred_prob > 0.5).astype(int).flatten()
     
     # Вывод отчета о классификации
@@ -329,13 +643,57 @@ def train_model(X: np.ndarray, y: np.ndarray, args: argparse.Namespace) -> tf.ke
     except ImportError:
         print("Не удалось сохранить модель в формате TensorFlow.js. Установите tensorflowjs: pip install tensorflowjs")
     
+    # Сохранение квантованной int8-модели для инференса
+    export_tflite_int8(model, X_train, args.output_dir)
+    
     # Построение графиков
     plot_training_history(history, args.output_dir)
     
     return model
 
+def export_tflite_int8(model: tf.keras.Model, X_train: np.ndarray, output_dir: str) -> None:
+    """Экспорт модели в TFLite с int8-квантованием весов (dynamic range)
+    
+    Веса Dense хранятся в int8, активации квантуются во время инференса;
+    вход и выход модели остаются float32.
+    """
+    import tensorflow as tf
+    from tensorflow.keras import mixed_precision
+    
+    # Слои float16 конвертер int8 не поддерживает: квантуется копия модели
+    # в float32 с теми же весами (веса при mixed_float16 и так хранятся в float32)
+    policy = mixed_precision.global_policy()
+    if policy.name != 'float32':
+        mixed_precision.set_global_policy('float32')
+        try:
+            float_model = create_model(X_train)
+            float_model.set_weights(model.get_weights())
+            model = float_model
+        finally:
+            mixed_precision.set_global_policy(policy)
+    
+    # Без representative_dataset конвертер не квантует активации статически:
+    # слой Normalization (без весов) остается в float, и Dense получают уже
+    # нормализованные признаки. Общий int8-масштаб для входа в сырых масштабах
+    # (длина контракта рядом со счетчиками) обнулил бы малые счетчики
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    
+    try:
+        tflite_model = converter.convert()
+    except Exception as e:
+        print(f"Не удалось сохранить модель в формате TFLite (int8): {e}")
+        return
+    
+    tflite_path = os.path.join(output_dir, 'model_int8.tflite')
+    with open(tflite_path, 'wb') as f:
+        f.write(tflite_model)
+    print(f"Модель сохранена в формате TFLite (int8) в {tflite_path}")
+
 def plot_training_history(history: tf.keras.callbacks.History, output_dir: str) -> None:
     """Построение графиков обучения"""
+    import matplotlib.pyplot as plt
+    
     print("Построение графиков обучения...")
     
     # График точности
@@ -390,18 +748,24 @@ def main() -> None:
     # Парсинг аргументов командной строки
     args = setup_argparse()
     
-    # Настройка GPU
-    configure_gpu(not args.no_gpu)
-    
-    # Загрузка контрактов
-    contracts = load_contracts(args.data_dir)
+    # Загрузка контрактов и извлечение признаков (или чтение их из кэша).
+    # Выполняется до импорта TensorFlow: процессы пула создаются через fork,
+    # а форк процесса с инициализированными TensorFlow/CUDA небезопасен
+    X, y = load_dataset(find_contracts(args.data_dir), args.workers, not args.no_feature_cache)
     
-    if not contracts:
+    if not len(X):
         print("Не удалось загрузить контракты. Выход.")
         sys.exit(1)
     
-    # Подготовка датасета
-    X, y = prepare_dataset(contracts)
+    # Настройка GPU
+    configure_gpu(not args.no_gpu)
+    
+    # Смешанная точность: вычисления в float16, веса в float32
+    if args.mixed_precision:
+        from tensorflow.keras import mixed_precision
+        
+        print("Включено обучение в смешанной точности (mixed_float16)")
+        mixed_precision.set_global_policy('mixed_float16')
     
     # Обучение модели
     model = train_model(X, y, args)
@@ -0,0 +1,149 @@
+"""
+DEP Framework - Тесты model_bridge.py
+
+Запуск: python -m unittest discover -s tests
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'model'))
+
+import model_bridge  # noqa: E402
+
+try:
+    import hyperscan
+except ImportError:
+    hyperscan = None
+
+
+class BytesOnlyDatabase:
+    """Обёртка над базой Hyperscan, которая, как hyperscan 0.4, принимает в scan только bytes"""
+
+    def __init__(self, db):
+        self.db = db
+
+    def scan(self, data, **kwargs):
+        if not isinstance(data, bytes):
+            raise TypeError("a bytes-like object is required")
+        return self.db.scan(data, **kwargs)
+
+
+class RecordingDatabase:
+    """Обёртка над базой Hyperscan, запоминающая типы буферов, переданных в scan"""
+
+    def __init__(self, db):
+        self.db = db
+        self.scanned_types = []
+
+    def scan(self, data, **kwargs):
+        self.scanned_types.append(type(data))
+        return self.db.scan(data, **kwargs)
+
+
+@unittest.skipIf(hyperscan is None, "hyperscan не установлен")
+class TestLargeContractHyperscan(unittest.TestCase):
+    """Аудит контракта от MMAP_MIN_SIZE (путь через mmap) с движком Hyperscan"""
+
+    def setUp(self):
+        line = 'contract A { function f() public { msg.sender.call{value: 1}(""); x += 1; } }\n'
+        handle, self.path = tempfile.mkstemp(suffix='.sol')
+        with os.fdopen(handle, 'w') as f:
+            f.write(line * (model_bridge.MMAP_MIN_SIZE // len(line) + 1))
+        self.assertGreaterEqual(os.path.getsize(self.path), model_bridge.MMAP_MIN_SIZE)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_audit_matches_pure_python_scan(self):
+        db = BytesOnlyDatabase(model_bridge._build_hyperscan_db(hyperscan))
+        with mock.patch.object(model_bridge, '_prefilter_backend', return_value=(db, None)):
+            result = model_bridge.audit_contract(self.path)
+        with mock.patch.object(model_bridge, '_prefilter_backend', return_value=(None, None)):
+            expected = model_bridge.audit_contract(self.path)
+
+        self.assertTrue(result["is_vulnerable"])
+        self.assertEqual(result, expected)
+
+    def test_buffer_is_scanned_without_copy(self):
+        db = RecordingDatabase(model_bridge._build_hyperscan_db(hyperscan))
+        with mock.patch.object(model_bridge, '_prefilter_backend', return_value=(db, None)):
+            model_bridge.audit_contract(self.path)
+
+        # Копия в bytes допустима только как повтор после отказа старой версии hyperscan
+        self.assertIs(db.scanned_types[0], model_bridge.mmap.mmap)
+        self.assertLessEqual(len(db.scanned_types), 2)
+
+
+class TestResultCacheLimit(unittest.TestCase):
+    """Ограничение числа результатов в кэше model/.cache"""
+
+    def test_oldest_results_are_pruned(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            for i in range(12):
+                path = os.path.join(cache_dir, f"{i:02d}.audit.json")
+                with open(path, 'w') as f:
+                    f.write('{}')
+                os.utime(path, ns=(i, i))
+            open(os.path.join(cache_dir, 'db.hsdb'), 'wb').close()
+
+            with mock.patch.object(model_bridge, 'CACHE_DIR', cache_dir), \
+                    mock.patch.object(model_bridge, 'CACHE_MAX_ENTRIES', 10):
+                model_bridge._prune_cache()
+
+            self.assertEqual(sorted(os.listdir(cache_dir)),
+                             [f"{i:02d}.audit.json" for i in range(3, 12)] + ['db.hsdb'])
+
+    def test_no_cache_skips_cache_dir(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            with mock.patch.object(model_bridge, 'CACHE_DIR', cache_dir):
+                result = model_bridge._cached(b'contract A {}', 'audit', lambda: {'ok': True}, use_cache=False)
+            self.assertEqual(result, {'ok': True})
+            self.assertEqual(os.listdir(cache_dir), [])
+
+
+
+class TestGenerateTestCases(unittest.TestCase):
+    """Значения параметров в тест-кейсах generate_test_cases"""
+
+    def test_params_with_storage_location_and_payable(self):
+        test_cases = model_bridge.generate_test_cases(
+            "function f(string memory s, address payable to, uint[] memory xs) public {")
+
+        self.assertEqual(test_cases[0]["function"], "f")
+        self.assertEqual(test_cases[0]["params"], {
+            's': 'test',
+            'to': '0x1234567890123456789012345678901234567890',
+            'xs': None,
+        })
+
+
+class TestGeneratePatch(unittest.TestCase):
+    """Патчи generate_patch для найденных уязвимостей"""
+
+    def test_reentrancy_patch_names_enclosing_function(self):
+        contract_code = "\n".join([
+            "contract Bank {",
+            "    function deposit() public payable {",
+            "        balances[msg.sender] += msg.value;",
+            "    }",
+            "    function withdrawAll(uint256 amount) public {",
+            "        msg.sender.call{value: amount}(\"\");",
+            "        balances[msg.sender] -= amount;",
+            "    }",
+            "}",
+        ])
+        vulnerabilities = model_bridge.find_vulnerabilities(contract_code)
+        reentrancy = next(v for v in vulnerabilities if v["name"] == "Reentrancy Vulnerability")
+        self.assertEqual(reentrancy["lines"][0]["line_number"], 6)
+
+        patch = model_bridge.generate_patch(contract_code, reentrancy)
+
+        self.assertIn("function withdrawAll(uint256 amount) public {", patch)
+        self.assertNotIn("deposit", patch)
+
+if __name__ == '__main__':
+    unittest.main()